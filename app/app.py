@@ -1,4 +1,7 @@
+from contextlib import asynccontextmanager
+
 import bofire
+import db
 from fastapi import FastAPI
 from routers.candidates import router as candidates_router
 from routers.proposals import router as proposals_router
@@ -7,7 +10,21 @@ from starlette.responses import RedirectResponse
 
 APP_VERSION = "0.0.1"
 
-app = FastAPI(title="BoFire Candidates API", version=APP_VERSION, root_path="/")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the shared database connection at startup and closes it on shutdown."""
+    app.state.db = db.connect()
+    yield
+    app.state.db.close()
+
+
+app = FastAPI(
+    title="BoFire Candidates API",
+    version=APP_VERSION,
+    root_path="/",
+    lifespan=lifespan,
+)
 
 
 @app.get("/", include_in_schema=False)
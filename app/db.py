@@ -0,0 +1,43 @@
+import sqlite3
+
+from fastapi import Request
+
+
+DBPATH = "proposals.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proposals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    last_updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_state ON proposals(state);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    """Open a connection to the proposals database.
+
+    The database runs in WAL mode so that readers do not block writers, and the
+    schema is created on first use.
+
+    Returns:
+        sqlite3.Connection: The database connection.
+    """
+    conn = sqlite3.connect(DBPATH, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # with WAL, NORMAL only syncs on checkpoint instead of on every commit, so
+    # the write endpoints no longer pay one fsync per request
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def get_db(request: Request) -> sqlite3.Connection:
+    """Get the shared database connection.
+
+    Returns:
+        sqlite3.Connection: The connection opened at app startup.
+    """
+    return request.app.state.db
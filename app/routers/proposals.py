@@ -1,45 +1,97 @@
 import datetime
+import functools
+import sqlite3
+import time
 from typing import Annotated, List, Optional, Tuple
 
+import anyio
+import orjson
+import pyarrow as pa
 from bofire.data_models.dataframes.api import Candidates, Experiments
 from bofire.data_models.strategies.api import AnyStrategy
-from fastapi import APIRouter, Depends, HTTPException
+from db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from models.proposals import Proposal, ProposalRequest, StateEnum
-from tinydb import Query, TinyDB
+from pydantic import ValidationError
 
 
-DBPATH = "db.json"
+router = APIRouter(prefix="/proposals", tags=["proposals"])
 
-db = None
+# serializes writers on the shared connection; readers can run concurrently
+# thanks to WAL mode
+_write_lock = anyio.Lock()
 
+# wakes up long-polling claimers as soon as a new proposal is created
+_proposal_created = anyio.Condition()
 
-async def get_db():
-    """Get the database connection.
+# bumped on every write; used as cache key so cached reads are invalidated
+# implicitly (the file mtime is unreliable in WAL mode)
+_db_generation = 0
 
-    Yields:
-        TinyDB: The database connection.
-    """
-    # todo: handle chaching
-    db = TinyDB(DBPATH, default=str)
-    try:
-        yield db
-    finally:
-        db.close()
+
+# module-scope statement texts so repeated calls present sqlite's
+# compiled-statement cache with the exact same string every time
+_SQL_NEXT_ID = "SELECT COALESCE(MAX(id), 0) + 1 FROM proposals"
+_SQL_INSERT = (
+    "INSERT INTO proposals (id, state, payload, last_updated_at) VALUES (?, ?, ?, ?)"
+)
+_SQL_CLAIM = (
+    "UPDATE proposals SET state = ?1, last_updated_at = ?2, "
+    "payload = json_set(payload, '$.state', ?1, '$.last_updated_at', ?2) "
+    "WHERE id = (SELECT id FROM proposals WHERE state = ?3 ORDER BY id LIMIT 1) "
+    "RETURNING id, payload"
+)
+_SQL_GET_PAYLOAD = "SELECT payload FROM proposals WHERE id = ?"
+_SQL_GET_CANDIDATES = (
+    "SELECT json_extract(payload, '$.candidates') FROM proposals WHERE id = ?"
+)
+_SQL_GET_STATE = "SELECT state FROM proposals WHERE id = ?"
+_SQL_UPDATE = (
+    "UPDATE proposals SET state = ?, payload = ?, last_updated_at = ? WHERE id = ?"
+)
+_SQL_LIST = (
+    "SELECT id, payload FROM proposals WHERE (?1 IS NULL OR state = ?1) "
+    "ORDER BY id LIMIT ?2 OFFSET ?3"
+)
 
 
-router = APIRouter(prefix="/proposals", tags=["proposals"])
+def _bump_generation() -> None:
+    global _db_generation
+    _db_generation += 1
+
+
+@functools.lru_cache(maxsize=1024)
+def _load_proposal(
+    proposal_id: int, generation: int, db: sqlite3.Connection
+) -> Optional[Proposal]:
+    """Loads and validates a proposal, cached per database generation."""
+    row = db.execute(_SQL_GET_PAYLOAD, (proposal_id,)).fetchone()
+    if row is None:
+        return None
+    proposal = Proposal(**orjson.loads(row[0]))
+    proposal.id = proposal_id
+    return proposal
+
+
+def _fetch_one(db: sqlite3.Connection, sql: str, params: Tuple = ()):
+    return db.execute(sql, params).fetchone()
+
+
+def _fetch_all(db: sqlite3.Connection, sql: str, params: Tuple = ()):
+    return db.execute(sql, params).fetchall()
 
 
 @router.post("", response_model=Proposal)
-def create_proposal(
+async def create_proposal(
     proposal_request: ProposalRequest,
-    db: Annotated[str, Depends(get_db)],  # type: ignore
+    db: Annotated[sqlite3.Connection, Depends(get_db)],
 ) -> Proposal:
     """Creates a proposal for candidates.
 
     Args:
         proposal_request (ProposalRequest): The original request for the proposal.
-        db (Annotated[str, Depends): The database to store the proposal.
+        db (Annotated[sqlite3.Connection, Depends]): The database to store the proposal.
 
     Returns:
         Proposal: The created proposal.
@@ -47,31 +99,108 @@ def create_proposal(
     proposal_request_data = proposal_request.model_dump()
     proposal = Proposal(**proposal_request_data)
 
-    id = db.insert(proposal.model_dump())
-    proposal.id = id
+    async with _write_lock:
+        await run_in_threadpool(_insert_proposal, proposal, db)
+    _bump_generation()
+    async with _proposal_created:
+        _proposal_created.notify_all()
     return proposal
 
 
+def _insert_proposal(proposal: Proposal, db: sqlite3.Connection) -> None:
+    """Allocates the next proposal ID and inserts the proposal in one write.
+
+    The ID is assigned before serializing, so the stored payload already
+    carries it and no follow-up update or re-read is needed.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        proposal.id = db.execute(_SQL_NEXT_ID).fetchone()[0]
+        db.execute(
+            _SQL_INSERT,
+            (
+                proposal.id,
+                proposal.state.value,
+                orjson.dumps(proposal.model_dump(mode="json")).decode(),
+                proposal.last_updated_at.isoformat(),
+            ),
+        )
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+
+
+def _claim_created_proposal(db: sqlite3.Connection):
+    """Atomically claims the oldest created proposal.
+
+    Args:
+        db (sqlite3.Connection): The database holding the proposals.
+
+    Returns:
+        Optional[Tuple[int, str]]: The claimed proposal's id and payload, or
+            None if no proposal is claimable.
+    """
+    # claim in a single atomic statement so that two concurrent workers can
+    # never claim the same proposal
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        row = db.execute(
+            _SQL_CLAIM,
+            (
+                StateEnum.CLAIMED.value,
+                datetime.datetime.now().isoformat(),
+                StateEnum.CREATED.value,
+            ),
+        ).fetchone()
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    return row
+
+
 @router.get(
     "/claim",
     response_model=Tuple[
         int, AnyStrategy, int, Optional[Experiments], Optional[Candidates]
     ],
 )
-def claim_proposal(  # works
-    db: Annotated[str, Depends(get_db)],  # type: ignore
+async def claim_proposal(
+    db: Annotated[sqlite3.Connection, Depends(get_db)],
+    wait: Annotated[
+        float,
+        Query(
+            ge=0.0,
+            le=60.0,
+            description="Seconds to wait for a claimable proposal before responding 404",
+        ),
+    ] = 0.0,
 ) -> Tuple[int, AnyStrategy, int, Optional[Experiments], Optional[Candidates]]:
-    dict_proposal = db.search(Query().state == StateEnum.CREATED)
-    if len(dict_proposal) == 0:
-        raise HTTPException(status_code=404, detail="No proposals to claim")
-    proposal = Proposal(**dict_proposal[0])
-    db.update(
-        {"state": StateEnum.CLAIMED, "last_updated_at": datetime.datetime.now()},
-        doc_ids=[dict_proposal[0].doc_id],
-    )
-    # TODO: id is wrong
+    # long-poll: instead of forcing clients to re-request on a fixed interval,
+    # block server-side until a proposal is created or the wait expires
+    async def try_claim():
+        async with _write_lock:
+            return await run_in_threadpool(_claim_created_proposal, db)
+
+    deadline = time.monotonic() + wait
+    row = await try_claim()
+    while row is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(status_code=404, detail="No proposals to claim")
+        async with _proposal_created:
+            # re-check while holding the condition: a notify landing between a
+            # failed claim and the wait below would otherwise be lost and the
+            # claimer would sleep out its full budget
+            row = await try_claim()
+            if row is None:
+                with anyio.move_on_after(remaining):
+                    await _proposal_created.wait()
+    _bump_generation()
+    proposal = Proposal(**orjson.loads(row[1]))
     return (
-        dict_proposal[0].doc_id,
+        row[0],
         proposal.strategy_data,
         proposal.n_candidates,
         proposal.experiments,
@@ -79,37 +208,77 @@ def claim_proposal(  # works
     )
 
 
+async def get_proposal_from_db(proposal_id: int, db: sqlite3.Connection) -> Proposal:
+    """Loads a proposal from the database.
+
+    Args:
+        proposal_id (int): The ID of the proposal.
+        db (sqlite3.Connection): The database holding the proposals.
+
+    Raises:
+        HTTPException: If no proposal with the given ID exists.
+
+    Returns:
+        Proposal: The loaded proposal.
+    """
+    proposal = await run_in_threadpool(_load_proposal, proposal_id, _db_generation, db)
+    if proposal is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    # copy so that callers mutating the proposal do not alter the cached entry
+    return proposal.model_copy()
+
+
+async def _update_proposal(proposal: Proposal, db: sqlite3.Connection) -> None:
+    """Writes an updated proposal back to the database."""
+    async with _write_lock:
+        await run_in_threadpool(
+            db.execute,
+            _SQL_UPDATE,
+            (
+                proposal.state.value,
+                orjson.dumps(proposal.model_dump(mode="json")).decode(),
+                proposal.last_updated_at.isoformat(),
+                proposal.id,
+            ),
+        )
+    _bump_generation()
+
+
 @router.get("/{proposal_id}", response_model=Proposal)
-def get_proposal(proposal_id: int, db: Annotated[str, Depends(get_db)]) -> Proposal:  # type: ignore
-    dict_proposal = db.get(doc_id=proposal_id)
-    if dict_proposal is None:
+async def get_proposal(
+    proposal_id: int, db: Annotated[sqlite3.Connection, Depends(get_db)]
+) -> Response:
+    # the stored payload is already the serialized proposal, so return it
+    # as-is instead of re-validating and re-encoding it
+    row = await run_in_threadpool(_fetch_one, db, _SQL_GET_PAYLOAD, (proposal_id,))
+    if row is None:
         raise HTTPException(status_code=404, detail="Proposal not found")
-    proposal = Proposal(**dict_proposal)
-    proposal.id = dict_proposal.doc_id
-    return proposal
+    return Response(content=row[0], media_type="application/json")
 
 
 @router.get("/{proposal_id}/candidates", response_model=Candidates)
-def get_candidates(proposal_id: int, db: Annotated[str, Depends(get_db)]) -> Candidates:  # type: ignore
-    dict_proposal = db.get(doc_id=proposal_id)
-    if dict_proposal is None:
+async def get_candidates(
+    proposal_id: int, db: Annotated[sqlite3.Connection, Depends(get_db)]
+) -> Response:
+    # extract only the candidates from the payload, skipping the re-validation
+    # of the full proposal we wrote ourselves
+    row = await run_in_threadpool(
+        _fetch_one,
+        db,
+        _SQL_GET_CANDIDATES,
+        (proposal_id,),
+    )
+    if row is None:
         raise HTTPException(status_code=404, detail="Proposal not found")
-    proposal = Proposal(**dict_proposal)
-    if proposal.candidates is None:
+    if row[0] is None:
         raise HTTPException(status_code=404, detail="Candidates not found")
-    return proposal.candidates
+    return Response(content=row[0], media_type="application/json")
 
 
-@router.post("/{proposal_id}/mark_processed", response_model=StateEnum)
-def mark_processed(
-    proposal_id: int,
-    candidates: Candidates,
-    db: Annotated[str, Depends(get_db)],  # type: ignore
+async def _finish_proposal(
+    proposal: Proposal, candidates: Candidates, db: sqlite3.Connection
 ) -> StateEnum:
-    dict_proposal = db.get(doc_id=proposal_id)
-    if dict_proposal is None:
-        raise HTTPException(status_code=404, detail="Proposal not found")
-    proposal = Proposal(**dict_proposal)
+    """Attaches the candidates to the proposal and marks it as finished."""
     if len(candidates.rows) != proposal.n_candidates:
         raise HTTPException(
             status_code=404,
@@ -118,36 +287,103 @@ def mark_processed(
     proposal.candidates = candidates
     proposal.last_updated_at = datetime.datetime.now()
     proposal.state = StateEnum.FINISHED
-    db.update(proposal.model_dump(), doc_ids=[proposal_id])
+    await _update_proposal(proposal, db)
     return proposal.state
 
 
+@router.post("/{proposal_id}/mark_processed", response_model=StateEnum)
+async def mark_processed(
+    proposal_id: int,
+    request: Request,
+    db: Annotated[sqlite3.Connection, Depends(get_db)],
+) -> StateEnum:
+    """Marks a proposal as processed from a JSON encoded candidates frame.
+
+    The body is consumed from the request stream and validated directly from
+    the raw bytes, skipping the intermediate dict that FastAPI's body parsing
+    would materialize next to the incoming payload.
+    """
+    proposal = await get_proposal_from_db(proposal_id, db)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+    try:
+        candidates = Candidates.model_validate_json(bytes(body))
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=e.errors(
+                include_url=False, include_context=False, include_input=False
+            ),
+        )
+    return await _finish_proposal(proposal, candidates, db)
+
+
+@router.post("/{proposal_id}/mark_processed_arrow", response_model=StateEnum)
+async def mark_processed_arrow(
+    proposal_id: int,
+    request: Request,
+    db: Annotated[sqlite3.Connection, Depends(get_db)],
+) -> StateEnum:
+    """Marks a proposal as processed from an Arrow IPC encoded candidates frame.
+
+    Accepts the candidates dataframe as an Arrow IPC stream
+    (Content-Type: application/vnd.apache.arrow.stream), which avoids the
+    per-cell JSON encode/validate work of the JSON endpoint.
+    """
+    proposal = await get_proposal_from_db(proposal_id, db)
+    body = await request.body()
+    try:
+        df_candidates = pa.ipc.open_stream(body).read_all().to_pandas()
+        candidates = Candidates.from_pandas(
+            df_candidates, proposal.strategy_data.domain
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=422, detail=f"Invalid Arrow candidates payload: {e}"
+        )
+    return await _finish_proposal(proposal, candidates, db)
+
+
 @router.post("/{proposal_id}/mark_failed", response_model=StateEnum)
-def mark_failed(
+async def mark_failed(
     proposal_id: int,
     error_message: dict[str, str],
-    db: Annotated[str, Depends(get_db)],  # type: ignore
+    db: Annotated[sqlite3.Connection, Depends(get_db)],
 ) -> StateEnum:
-    dict_proposal = db.get(doc_id=proposal_id)
-    if dict_proposal is None:
-        raise HTTPException(status_code=404, detail="Proposal not found")
-    proposal = Proposal(**dict_proposal)
+    proposal = await get_proposal_from_db(proposal_id, db)
     proposal.last_updated_at = datetime.datetime.now()
     proposal.state = StateEnum.FAILED
     proposal.error_message = error_message["msg"]
-    db.update(proposal.model_dump(), doc_ids=[proposal_id])
+    await _update_proposal(proposal, db)
     return proposal.state
 
 
-@router.get("/{proposal_id}/state", response_model=StateEnum)  # works
-def get_state(proposal_id: int, db: Annotated[str, Depends(get_db)]) -> StateEnum:  # type: ignore
-    dict_proposal = db.get(doc_id=proposal_id)
-    if dict_proposal is None:
+@router.get("/{proposal_id}/state", response_model=StateEnum)
+async def get_state(
+    proposal_id: int, db: Annotated[sqlite3.Connection, Depends(get_db)]
+) -> Response:
+    # the state lives in its own indexed column, no need to touch the payload
+    row = await run_in_threadpool(_fetch_one, db, _SQL_GET_STATE, (proposal_id,))
+    if row is None:
         raise HTTPException(status_code=404, detail="Proposal not found")
-    proposal = Proposal(**dict_proposal)
-    return proposal.state
+    return Response(content=orjson.dumps(row[0]), media_type="application/json")
 
 
 @router.get("", response_model=List[Proposal])
-def get_proposals(db: Annotated[str, Depends(get_db)]) -> List[Proposal]:  # type: ignore
-    return [Proposal(**{**d, **{"id": d.doc_id}}) for d in db.all()]
+async def get_proposals(
+    db: Annotated[sqlite3.Connection, Depends(get_db)],
+    limit: Annotated[int, Query(gt=0, le=1000, description="Page size")] = 100,
+    offset: Annotated[int, Query(ge=0, description="Number of proposals to skip")] = 0,
+    state: Annotated[
+        Optional[StateEnum], Query(description="Only return proposals in this state")
+    ] = None,
+) -> List[Proposal]:
+    """Returns a page of proposals, optionally filtered by state."""
+    rows = await run_in_threadpool(
+        _fetch_all,
+        db,
+        _SQL_LIST,
+        (state.value if state is not None else None, limit, offset),
+    )
+    return [Proposal(**{**orjson.loads(payload), "id": id}) for id, payload in rows]
@@ -26,7 +26,8 @@ def client() -> Client:
     return Client(base_url=os.getenv("CANDIDATES_URL", "http://localhost:8000"))
 
 
-def pytest_sessionstart(session):
-    db_file = "db.json"
-    if os.path.exists(db_file):
-        os.remove(db_file)
+# Note: the proposals database is removed in the test workflow before the
+# server starts. Deleting it here would be ineffective, since the already
+# running server keeps serving the open (then unlinked) database file; for the
+# same reason, re-running pytest against a long-lived server does not isolate
+# runs.
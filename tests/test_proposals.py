@@ -4,7 +4,7 @@ from bofire.benchmarks.api import Himmelblau
 from bofire.data_models.dataframes.api import Candidates
 from bofire.data_models.strategies.api import RandomStrategy
 
-from app.models.proposals import Proposal, ProposalRequest
+from app.models.proposals import Proposal, ProposalRequest, StateEnum
 from tests.conftest import Client
 
 
@@ -49,6 +49,13 @@ def test_proposals(client: Client):
     status = json.loads(client.get(path=f"/proposals/{proposal.id}/state").content)
     assert status == "CLAIMED"
 
+    # the full proposal reflects the claim as well
+    claimed_proposal = Proposal(
+        **json.loads(client.get(path=f"/proposals/{proposal.id}").content)
+    )
+    assert claimed_proposal.state == StateEnum.CLAIMED
+    assert claimed_proposal.last_updated_at > proposal.last_updated_at
+
     # mark as failed
     client.post(
         path=f"/proposals/{proposal.id}/mark_failed",
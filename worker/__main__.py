@@ -20,8 +20,8 @@ def main():
         datefmt="%Y-%m-%dT%H:%M:%S%z",
     )
     logging.info("config from environment:")
-    for k in ["LOG_LEVEL", "BACKEND_URL"]:
-        logging.info(f"    {k}: {os.environ.get(k)}")
+    for k in ["LOG_LEVEL", "BACKEND_URL", "MAX_PROPOSAL_SECONDS"]:
+        logging.info("    %s: %s", k, os.environ.get(k))
 
     if os.environ.get("LOG_LEVEL", "INFO") in LOG_LEVELS.keys():
         log_level = LOG_LEVELS[os.environ.get("LOG_LEVEL", "INFO")]
@@ -29,15 +29,20 @@ def main():
         log_level = LOG_LEVELS["INFO"]
 
     logging.getLogger().setLevel(log_level)
-    logging.info(f"log level set to {log_level}")
+    logging.info("log level set to %s", log_level)
 
     # worker configuration
     backend_url = os.environ.get("BACKEND_URL", "http://localhost:8000")
-    logging.info(f"backend url set to: {backend_url}")
+    logging.info("backend url set to: %s", backend_url)
     job_check_interval = float(os.environ.get("JOB_CHECK_INTERVAL", 10))
+    max_proposal_seconds = float(os.environ.get("MAX_PROPOSAL_SECONDS", 3600))
 
     client = Client(url=backend_url)
-    worker = Worker(client=client, job_check_interval=job_check_interval)
+    worker = Worker(
+        client=client,
+        job_check_interval=job_check_interval,
+        max_proposal_seconds=max_proposal_seconds,
+    )
     worker.work()
 
 
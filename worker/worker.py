@@ -1,21 +1,36 @@
+import functools
 import json
 import logging
 import multiprocessing as mp
-import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.pool import Pool
 from typing import Dict, Optional, Tuple
 
 import bofire.strategies.api as strategies
+import pyarrow as pa
 import requests
 from bofire.data_models.dataframes.api import Candidates, Experiments
 from bofire.data_models.strategies.api import AnyStrategy
-from pydantic import BaseModel, TypeAdapter, model_validator
+from pydantic import BaseModel, PrivateAttr, TypeAdapter, model_validator
+from requests.adapters import HTTPAdapter, Retry
 
 
 class Client(BaseModel):
     url: str = "http://localhost:8000"
 
+    # session is kept for the lifetime of the client so connections are pooled
+    # and reused instead of being re-established on every poll
+    _session: requests.Session = PrivateAttr(default_factory=requests.Session)
+
     @model_validator(mode="after")
     def validate_url(self):
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=Retry(total=3, backoff_factor=0.2),
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         try:
             self.get_version()
         except Exception:
@@ -26,11 +41,18 @@ class Client(BaseModel):
     def headers(self):
         return {"accept": "application/json", "Content-Type": "application/json"}
 
-    def get(self, path: str) -> requests.Response:
-        return requests.get(f"{self.url}{path}", headers=self.headers)
+    def get(
+        self,
+        path: str,
+        params: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> requests.Response:
+        return self._session.get(
+            f"{self.url}{path}", params=params, headers=self.headers, timeout=timeout
+        )
 
     def post(self, path: str, request_body: Dict) -> requests.Response:
-        return requests.post(
+        return self._session.post(
             f"{self.url}{path}", json=request_body, headers=self.headers
         )
 
@@ -39,14 +61,19 @@ class Client(BaseModel):
         return response.json()
 
     def claim_proposal(
-        self,
+        self, wait: float = 0.0
     ) -> Optional[
         Tuple[int, AnyStrategy, int, Optional[Experiments], Optional[Candidates]]
     ]:
+        # the server caps the long-poll budget at 60 seconds; clamp so larger
+        # job check intervals do not get rejected as invalid
+        wait = min(wait, 60.0)
         response = self.get(
             "/proposals/claim",
+            params={"wait": wait},
+            timeout=wait + 5,
         )
-        if response.status_code == 404:
+        if response.status_code != 200:
             return None
         loaded_response = json.loads(response.content)
 
@@ -71,6 +98,22 @@ class Client(BaseModel):
         )
         return response.json()
 
+    def mark_processed_arrow(self, proposal_id: int, data: bytes):
+        """Marks a proposal as processed from Arrow IPC encoded candidates.
+
+        The binary encoding skips the per-cell JSON string work on both ends
+        and produces considerably smaller payloads for large candidate sets.
+        """
+        response = self._session.post(
+            f"{self.url}/proposals/{proposal_id}/mark_processed_arrow",
+            data=data,
+            headers={
+                "accept": "application/json",
+                "Content-Type": "application/vnd.apache.arrow.stream",
+            },
+        )
+        return response.json()
+
     def mark_failed(self, proposal_id: int, error_message: str):
         response = self.post(
             f"/proposals/{proposal_id}/mark_failed", request_body={"msg": error_message}
@@ -78,14 +121,47 @@ class Client(BaseModel):
         return response.json()
 
 
+def _preload():
+    """Imports the heavy strategy stack once per pool worker."""
+    import bofire.strategies.api  # noqa: F401
+
+
+def _candidates_to_arrow(candidates: Candidates) -> bytes:
+    """Encodes a candidates frame as an Arrow IPC stream."""
+    table = pa.Table.from_pandas(candidates.to_pandas(), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+@functools.lru_cache(maxsize=16)
+def _map_strategy(strategy_data_json: str):
+    """Builds a strategy from its serialized data model, cached per config.
+
+    In typical BO loops the strategy config is constant across rounds and only
+    the experiments grow, so mapping the data model (GP/acqf setup) can be
+    reused. The cache lives in the pool worker process.
+    """
+    strategy_data = TypeAdapter(AnyStrategy).validate_json(strategy_data_json)
+    return strategies.map(strategy_data)
+
+
 class Worker(BaseModel):
     client: Client
     job_check_interval: float
+    max_proposal_seconds: float = 3600.0
     round: int = 0
 
-    def sleep(self, sleep_time_sec: float, msg: str = ""):
-        logging.debug(f"Sleeping for {sleep_time_sec} second(s) ({msg})")
-        time.sleep(sleep_time_sec)
+    # persistent pool so the scientific stack is imported once per worker
+    # process instead of once per proposal
+    _pool: Optional[Pool] = PrivateAttr(default=None)
+
+    @property
+    def pool(self) -> Pool:
+        if self._pool is None:
+            self._pool = mp.Pool(processes=1, initializer=_preload)
+        return self._pool
 
     def work(self):
         while True:
@@ -98,55 +174,74 @@ class Worker(BaseModel):
         n_candidates: int,
         experiments: Experiments,
         pendings: Candidates,
-        conn_obj: "mp.connection.Connection",
-    ):
+    ) -> Tuple[str, int]:
         try:
-            strategy = strategies.map(strategy_data)
             if experiments is not None:
-                strategy.tell(experiments.to_pandas())
+                # reuse the mapped strategy across rounds with the same config;
+                # replace=True makes repeated tells idempotent
+                strategy = _map_strategy(strategy_data.model_dump_json())
+                strategy.tell(experiments.to_pandas(), replace=True)
+            else:
+                # without experiments there is no fresh state to overwrite a
+                # previously told strategy with, so build an unshared one
+                strategy = strategies.map(strategy_data)
             df_candidates = strategy.ask(n_candidates)
-            msg = Candidates.from_pandas(df_candidates, strategy_data.domain)
+            candidates = Candidates.from_pandas(df_candidates, strategy_data.domain)
+            # hand the result back through shared memory: only the block name
+            # and size travel over the pool's pipe, no dataframe pickling
+            data = _candidates_to_arrow(candidates)
+            shm = shared_memory.SharedMemory(create=True, size=len(data))
+            shm.buf[: len(data)] = data
+            name = shm.name
+            shm.close()
+            # ownership passes to the parent, which unlinks the block after
+            # reading; drop the child-side tracker registration so shutdown
+            # does not warn about leaked segments
+            resource_tracker.unregister(shm._name, "shared_memory")
+            return name, len(data)
         except Exception as e:
-            msg = Exception(str(e))
-        finally:
-            conn_obj.send(msg)
+            # re-raise as a plain exception so it always pickles back to the
+            # parent process
+            raise Exception(str(e))
 
     def work_round(self):
-        logging.debug(f"Starting round {self.round}")
+        logging.debug("Starting round %s", self.round)
         self.round += 1
-        proposal = self.client.claim_proposal()
+        # long-poll: the server blocks up to job_check_interval seconds for a
+        # proposal, so there is nothing left to sleep on when none arrives
+        proposal = self.client.claim_proposal(wait=self.job_check_interval)
         if proposal is None:
             logging.debug("No proposal to work on")
-            self.sleep(self.job_check_interval, msg="No proposal to work on.")
             return
 
         proposal_id, strategy_data, n_candidates, experiments, pendings = proposal
-        logging.info(f"Claimed proposal {proposal_id}")
+        logging.info("Claimed proposal %s", proposal_id)
 
         try:
-            receiver, sender = mp.Pipe(False)
-            proc = mp.Process(
-                target=self.process_proposal,
-                args=(
-                    proposal_id,
-                    strategy_data,
-                    n_candidates,
-                    experiments,
-                    pendings,
-                    sender,
-                ),
+            result = self.pool.apply_async(
+                Worker.process_proposal,
+                (proposal_id, strategy_data, n_candidates, experiments, pendings),
             )
-            proc.start()
-
-            while True:
-                if receiver.poll(timeout=self.job_check_interval):
-                    candidates = receiver.recv()
-                    if isinstance(candidates, Exception):
-                        raise candidates
-                    else:
-                        self.client.mark_processed(proposal_id, candidates=candidates)
-                        logging.info(f"Proposal {proposal_id} processed successfully")
-                        break
+            try:
+                shm_name, nbytes = result.get(timeout=self.max_proposal_seconds)
+            except mp.TimeoutError:
+                # the pool process may be wedged in native code, so terminate
+                # it and start fresh instead of leaking a stuck process
+                self.pool.terminate()
+                self.pool.join()
+                self._pool = None
+                raise TimeoutError(
+                    f"Proposal {proposal_id} timed out after "
+                    f"{self.max_proposal_seconds} seconds"
+                )
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                data = bytes(shm.buf[:nbytes])
+            finally:
+                shm.close()
+                shm.unlink()
+            self.client.mark_processed_arrow(proposal_id, data=data)
+            logging.info("Proposal %s processed successfully", proposal_id)
         except Exception as e:
-            logging.error(f"Error processing proposal {proposal_id}: {e}")
+            logging.error("Error processing proposal %s: %s", proposal_id, e)
             self.client.mark_failed(proposal_id, error_message=str(e))